@@ -15,6 +15,7 @@
 
 
 import argparse
+import csv
 import json
 import logging
 import os
@@ -23,7 +24,7 @@ from unittest.mock import patch
 
 import torch
 
-from transformers import ViTMAEForPreTraining, Wav2Vec2ForPreTraining
+from transformers import ViTMAEForPreTraining, Wav2Vec2ForPreTraining, pipeline
 from transformers.testing_utils import CaptureLogger, TestCasePlus, get_gpu_count, slow, torch_device
 from transformers.utils import is_apex_available
 
@@ -112,8 +113,10 @@ class ExamplesTests(TestCasePlus):
             --overwrite_output_dir
             --train_file ./tests/fixtures/tests_samples/MRPC/train.csv
             --validation_file ./tests/fixtures/tests_samples/MRPC/dev.csv
+            --test_file ./tests/fixtures/tests_samples/MRPC/dev.csv
             --do_train
             --do_eval
+            --do_predict
             --per_device_train_batch_size=2
             --per_device_eval_batch_size=1
             --learning_rate=1e-4
@@ -131,6 +134,20 @@ class ExamplesTests(TestCasePlus):
             result = get_results(tmp_dir)
             self.assertGreaterEqual(result["eval_accuracy"], 0.75)
 
+        # The test set is sorted by length for prediction, the results must come back in the order of the file
+        with open("./tests/fixtures/tests_samples/MRPC/dev.csv", newline="") as f:
+            test_rows = list(csv.DictReader(f))
+        with open(os.path.join(tmp_dir, "predict_results_None.txt")) as f:
+            header, *predict_rows = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual(header, ["index", "prediction"])
+        self.assertEqual([int(index) for index, _ in predict_rows], list(range(len(test_rows))))
+
+        classifier = pipeline("text-classification", model=tmp_dir, device=0 if torch_device == "cuda" else -1)
+        expected = [
+            classifier({"text": row["sentence1"], "text_pair": row["sentence2"]})["label"] for row in test_rows
+        ]
+        self.assertEqual([prediction for _, prediction in predict_rows], expected)
+
     def test_run_clm(self):
         tmp_dir = self.get_auto_remove_tmp_dir()
         testargs = f"""
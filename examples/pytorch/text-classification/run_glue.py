@@ -16,16 +16,21 @@
 """ Finetuning the library models for sequence classification on GLUE."""
 # You can also adapt this script on your own text classification task. Pointers for this are left as comments.
 
+import hashlib
 import logging
 import os
 import random
 import sys
 from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
 from typing import Optional
 
 import datasets
 import numpy as np
-from datasets import load_dataset
+import torch
+from datasets import concatenate_datasets, load_dataset
+from datasets.fingerprint import Hasher
 
 import evaluate
 import transformers
@@ -43,7 +48,7 @@ from transformers import (
     set_seed,
 )
 from transformers.trainer_utils import get_last_checkpoint
-from transformers.utils import check_min_version, send_example_telemetry
+from transformers.utils import check_min_version, is_torch_bf16_gpu_available, send_example_telemetry
 from transformers.utils.versions import require_version
 
 
@@ -99,12 +104,23 @@ class DataTrainingArguments:
     overwrite_cache: bool = field(
         default=False, metadata={"help": "Overwrite the cached preprocessed datasets or not."}
     )
+    preprocessing_num_workers: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The number of processes to use for the preprocessing. Defaults to the number of CPUs, capped at 8 "
+                "and at one process per 1000 rows of the smallest split."
+            )
+        },
+    )
     pad_to_max_length: bool = field(
-        default=True,
+        default=False,
         metadata={
             "help": (
                 "Whether to pad all samples to `max_seq_length`. "
-                "If False, will pad the samples dynamically when batching to the maximum length in the batch."
+                "If False, will pad the samples dynamically when batching to the maximum length in the batch (rounded "
+                "up to a multiple of 8). Padding to the max length is mostly useful to keep shapes static, and is "
+                "always used on TPU."
             )
         },
     )
@@ -201,6 +217,117 @@ class ModelArguments:
         default=False,
         metadata={"help": "Will enable to load a pretrained model whose head dimensions are different."},
     )
+    local_files_only: bool = field(
+        default=False,
+        metadata={
+            "help": (
+                "Whether to only load the config, tokenizer and model from local files (e.g. the cache), without "
+                "checking huggingface.co for updates. Always enabled when `HF_HUB_OFFLINE=1`."
+            )
+        },
+    )
+    to_onnx: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": (
+                "Path of an ONNX file to export the fine-tuned model to. The exported graph has dynamic batch and "
+                "sequence axes, so it can be run on inputs of any shape."
+            )
+        },
+    )
+    onnx_opset: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The ONNX opset version to export the model with. Defaults to 13 (or the minimum supported by the "
+                "model if higher), which is required by ONNX Runtime to quantize the model to INT8 with standard "
+                "per-channel QuantizeLinear/DequantizeLinear ops."
+            )
+        },
+    )
+    num_threads: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The number of threads used by PyTorch for intra-op parallelism on CPU. Defaults to the PyTorch "
+                "setting (which follows `OMP_NUM_THREADS` when set)."
+            )
+        },
+    )
+    auto_bf16: bool = field(
+        default=True,
+        metadata={
+            "help": (
+                "Whether to train in bf16 mixed precision when the GPU supports it (Ampere or higher) and no other "
+                "mixed precision mode was requested. Use `--no_auto_bf16` to train in full precision."
+            )
+        },
+    )
+
+
+def collate_with_padding(features, tokenizer, pad_to_multiple_of=None):
+    """
+    Pads the already tokenized `features` to the longest one in the batch (optionally rounded up to
+    `pad_to_multiple_of`), filling the tensors directly instead of calling `tokenizer.pad` on each example.
+    """
+    pad_values = {
+        "input_ids": tokenizer.pad_token_id,
+        "token_type_ids": tokenizer.pad_token_type_id,
+        "attention_mask": 0,
+        "special_tokens_mask": 1,
+    }
+    max_length = max(len(feature["input_ids"]) for feature in features)
+    if pad_to_multiple_of is not None:
+        max_length = (max_length + pad_to_multiple_of - 1) // pad_to_multiple_of * pad_to_multiple_of
+
+    batch = {}
+    for key in features[0].keys():
+        if key in pad_values:
+            padded = torch.full((len(features), max_length), pad_values[key], dtype=torch.long)
+            for i, feature in enumerate(features):
+                values = torch.as_tensor(feature[key], dtype=torch.long)
+                if tokenizer.padding_side == "right":
+                    padded[i, : len(values)] = values
+                else:
+                    padded[i, max_length - len(values) :] = values
+            batch[key] = padded
+        else:
+            # The model expects the labels under `labels`
+            batch["labels" if key == "label" else key] = torch.tensor([feature[key] for feature in features])
+    return batch
+
+
+def sort_by_length(dataset):
+    """
+    Sorts the tokenized `dataset` by input length, so that dynamically padded batches group examples of similar
+    lengths. Returns the sorted dataset and the permutation applied.
+    """
+    order = np.argsort([len(input_ids) for input_ids in dataset["input_ids"]], kind="stable")
+    return dataset.select(order), order
+
+
+def logits_to_predictions(logits, is_regression):
+    # Models returning extra outputs give a tuple, the logits come first.
+    if type(logits) is tuple:
+        logits = logits[0]
+    return np.squeeze(logits) if is_regression else logits.argmax(axis=1)
+
+
+# You can define your custom compute_metrics function. It takes an `EvalPrediction` object (a namedtuple with a
+# predictions and label_ids field) and has to return a dictionary string to float.
+def compute_metrics_fn(p: EvalPrediction, metric, is_regression, task_name=None):
+    preds = logits_to_predictions(p.predictions, is_regression)
+    if task_name is not None:
+        result = metric.compute(predictions=preds, references=p.label_ids)
+        if len(result) > 1:
+            result["combined_score"] = float(sum(result.values()) / len(result))
+        return result
+    elif is_regression:
+        # A single dot product computes the sum of squared errors without allocating their array.
+        errors = preds - p.label_ids
+        return {"mse": np.dot(errors, errors).item() / errors.size}
+    else:
+        return {"accuracy": np.count_nonzero(preds == p.label_ids) / preds.size}
 
 
 def main():
@@ -234,10 +361,25 @@ def main():
     transformers.utils.logging.enable_default_handler()
     transformers.utils.logging.enable_explicit_format()
 
+    # Default to bf16 mixed precision on GPUs that support it, unless the user already picked a precision setup.
+    use_auto_bf16 = (
+        model_args.auto_bf16
+        and not (training_args.fp16 or training_args.bf16)
+        and training_args.deepspeed is None
+        and not training_args.sharded_ddp
+        and training_args.half_precision_backend != "apex"
+        and training_args.device.type == "cuda"
+        and is_torch_bf16_gpu_available()
+    )
+    if use_auto_bf16:
+        logger.info("bf16 is supported on this GPU, enabling bf16 mixed precision training.")
+        training_args.bf16 = True
+
     # Log on each process the small summary:
     logger.warning(
         f"Process rank: {training_args.local_rank}, device: {training_args.device}, n_gpu: {training_args.n_gpu}"
-        + f"distributed training: {bool(training_args.local_rank != -1)}, 16-bits training: {training_args.fp16}"
+        + f"distributed training: {bool(training_args.local_rank != -1)}, 16-bits training: "
+        + f"{training_args.fp16 or training_args.bf16}"
     )
     logger.info(f"Training/evaluation parameters {training_args}")
 
@@ -256,6 +398,10 @@ def main():
                 "the `--output_dir` or add `--overwrite_output_dir` to train from scratch."
             )
 
+    # On machines with many cores, one thread per core can oversubscribe the CPUs when several processes run.
+    if model_args.num_threads is not None:
+        torch.set_num_threads(model_args.num_threads)
+
     # Set seed before initializing model.
     set_seed(training_args.seed)
 
@@ -341,16 +487,24 @@ def main():
         if is_regression:
             num_labels = 1
         else:
-            # A useful fast method:
-            # https://huggingface.co/docs/datasets/package_reference/main_classes.html#datasets.Dataset.unique
-            label_list = raw_datasets["train"].unique("label")
-            label_list.sort()  # Let's sort it for determinism
+            # Read the label column as a numpy array and let numpy find the sorted (for determinism) unique values.
+            label_list = np.unique(raw_datasets["train"].with_format("numpy")["label"]).tolist()
             num_labels = len(label_list)
 
+    # Without training, there are no fp32 master weights to keep: evaluate the model directly in bf16 instead of
+    # autocasting it. Regression scores stay under autocast to avoid losing precision on STS-B-like tasks. Evaluating
+    # in bf16 casts the weights in place, so models that are saved, pushed or exported by this script stay under
+    # autocast as well.
+    model_is_written = training_args.do_train or training_args.push_to_hub or model_args.to_onnx is not None
+    if use_auto_bf16 and not model_is_written and not is_regression and not training_args.fp16_full_eval:
+        training_args.bf16_full_eval = True
+
     # Load pretrained model and tokenizer
     #
     # In distributed training, the .from_pretrained methods guarantee that only one local process can concurrently
     # download model & vocab.
+    # When the files are known to be available locally, skip the requests checking the Hub for newer versions.
+    local_files_only = model_args.local_files_only or os.environ.get("HF_HUB_OFFLINE", "0") == "1"
     config = AutoConfig.from_pretrained(
         model_args.config_name if model_args.config_name else model_args.model_name_or_path,
         num_labels=num_labels,
@@ -358,6 +512,7 @@ def main():
         cache_dir=model_args.cache_dir,
         revision=model_args.model_revision,
         use_auth_token=True if model_args.use_auth_token else None,
+        local_files_only=local_files_only,
     )
     tokenizer = AutoTokenizer.from_pretrained(
         model_args.tokenizer_name if model_args.tokenizer_name else model_args.model_name_or_path,
@@ -365,6 +520,7 @@ def main():
         use_fast=model_args.use_fast_tokenizer,
         revision=model_args.model_revision,
         use_auth_token=True if model_args.use_auth_token else None,
+        local_files_only=local_files_only,
     )
     model = AutoModelForSequenceClassification.from_pretrained(
         model_args.model_name_or_path,
@@ -373,9 +529,29 @@ def main():
         cache_dir=model_args.cache_dir,
         revision=model_args.model_revision,
         use_auth_token=True if model_args.use_auth_token else None,
+        local_files_only=local_files_only,
         ignore_mismatched_sizes=model_args.ignore_mismatched_sizes,
     )
 
+    # Check that the model can be exported before fine-tuning it, rather than failing at the very end of the run.
+    if model_args.to_onnx is not None:
+        # Importing the features manager loads the configuration of every model type, only pay for it when exporting.
+        from transformers.onnx import FeaturesManager, export
+
+        # The ONNX config declares the batch and sequence dimensions of every input and output as dynamic axes.
+        model_kind, model_onnx_config = FeaturesManager.check_supported_model_or_raise(
+            model, feature="sequence-classification"
+        )
+        onnx_config = model_onnx_config(model.config)
+        onnx_opset = model_args.onnx_opset
+        if onnx_opset is None:
+            onnx_opset = max(onnx_config.default_onnx_opset, 13)
+        elif onnx_opset < onnx_config.default_onnx_opset:
+            raise ValueError(
+                f"Opset {onnx_opset} is not sufficient to export {model_kind}. "
+                f"At least {onnx_config.default_onnx_opset} is required."
+            )
+
     # Preprocessing the raw_datasets
     if data_args.task_name is not None:
         sentence1_key, sentence2_key = task_to_keys[data_args.task_name]
@@ -391,11 +567,20 @@ def main():
                 sentence1_key, sentence2_key = non_label_column_names[0], None
 
     # Padding strategy
+    if training_args.device.type == "xla" and not data_args.pad_to_max_length:
+        # XLA compiles a new graph for every batch shape, dynamic padding would recompile the model at each step.
+        logger.info("Padding all samples to `max_seq_length` to keep the batch shapes static on TPU.")
+        data_args.pad_to_max_length = True
     if data_args.pad_to_max_length:
         padding = "max_length"
     else:
         # We will pad later, dynamically at batch creation, to the max sequence length in each batch
         padding = False
+        if training_args.torchdynamo is not None:
+            logger.warning(
+                "TorchDynamo specializes the compiled graphs on the input shapes, so dynamic padding will trigger a "
+                "recompilation for each new sequence length. Use `--pad_to_max_length` to keep the shapes static."
+            )
 
     # Some models have set the order of the labels to use, so let's make sure we do use it.
     label_to_id = None
@@ -406,12 +591,12 @@ def main():
     ):
         # Some have all caps in their config, some don't.
         label_name_to_id = {k.lower(): v for k, v in model.config.label2id.items()}
-        if list(sorted(label_name_to_id.keys())) == list(sorted(label_list)):
+        if set(label_name_to_id) == set(label_list):
             label_to_id = {i: int(label_name_to_id[label_list[i]]) for i in range(num_labels)}
         else:
             logger.warning(
-                "Your model seems to have been trained with labels, but they don't match the dataset: ",
-                f"model labels: {list(sorted(label_name_to_id.keys()))}, dataset labels: {list(sorted(label_list))}."
+                "Your model seems to have been trained with labels, but they don't match the dataset: "
+                f"model labels: {sorted(label_name_to_id)}, dataset labels: {sorted(label_list)}."
                 "\nIgnoring the model labels as a result.",
             )
     elif data_args.task_name is None and not is_regression:
@@ -431,51 +616,135 @@ def main():
         )
     max_seq_length = min(data_args.max_seq_length, tokenizer.model_max_length)
 
+    # When every sample is padded to the same length, fast tokenizers can return the batch as numpy arrays directly,
+    # which avoids building nested Python lists that `datasets` then has to convert back to Arrow.
+    return_tensors = "np" if tokenizer.is_fast and padding == "max_length" else None
+
+    if label_to_id is not None:
+        # Sorted lookup table, so that a whole batch of labels is remapped with `np.searchsorted` instead of one dict
+        # lookup per example.
+        label_keys = np.array(sorted(label_to_id))
+        label_ids = np.array([label_to_id[key] for key in label_keys.tolist()], dtype=np.int64)
+
     def preprocess_function(examples):
         # Tokenize the texts
         args = (
             (examples[sentence1_key],) if sentence2_key is None else (examples[sentence1_key], examples[sentence2_key])
         )
-        result = tokenizer(*args, padding=padding, max_length=max_seq_length, truncation=True)
+        result = tokenizer(
+            *args, padding=padding, max_length=max_seq_length, truncation=True, return_tensors=return_tensors
+        )
 
         # Map labels to IDs (not necessary for GLUE tasks)
         if label_to_id is not None and "label" in examples:
-            result["label"] = [(label_to_id[l] if l != -1 else -1) for l in examples["label"]]
+            labels = np.asarray(examples["label"])
+            # -1 marks unlabeled examples (e.g. in test sets) and is kept as is.
+            mask = labels != -1 if labels.dtype.kind in "iuf" else np.ones(len(labels), dtype=bool)
+            known_labels = labels[mask]
+            positions = np.searchsorted(label_keys, known_labels).clip(max=len(label_keys) - 1)
+            if (label_keys[positions] != known_labels).any():
+                unknown_labels = set(known_labels[label_keys[positions] != known_labels].tolist())
+                raise ValueError(
+                    f"Found labels {unknown_labels} that are not in the label list {label_keys.tolist()}."
+                )
+            result["label"] = np.full(len(labels), -1, dtype=np.int64)
+            result["label"][mask] = label_ids[positions]
         return result
 
+    # Only preprocess the splits this run actually uses.
+    used_splits = set()
+    if training_args.do_train:
+        used_splits.add("train")
+    if training_args.do_eval:
+        used_splits.update(("validation", "validation_matched", "validation_mismatched"))
+    if training_args.do_predict:
+        used_splits.update(("test", "test_matched", "test_mismatched"))
+    raw_datasets = datasets.DatasetDict(
+        {split: dataset for split, dataset in raw_datasets.items() if split in used_splits}
+    )
+
+    # Truncate the splits before tokenizing them, so that only the examples actually used are processed.
+    eval_split = "validation_matched" if data_args.task_name == "mnli" else "validation"
+    predict_split = "test_matched" if data_args.task_name == "mnli" else "test"
+    for split, max_samples in (
+        ("train", data_args.max_train_samples),
+        (eval_split, data_args.max_eval_samples),
+        (predict_split, data_args.max_predict_samples),
+    ):
+        if max_samples is not None and split in raw_datasets:
+            raw_datasets[split] = raw_datasets[split].select(range(min(len(raw_datasets[split]), max_samples)))
+
+    # Name the tokenized cache files after the preprocessing settings, so that runs sharing the same data, tokenizer
+    # and sequence length reuse the memory-mapped Arrow files instead of tokenizing everything again.
+    preprocessing_key = "-".join(
+        str(part)
+        for part in (
+            model_args.tokenizer_name if model_args.tokenizer_name else model_args.model_name_or_path,
+            model_args.model_revision,
+            type(tokenizer).__name__,
+            # The name alone does not identify the vocabulary when a local directory is reused for another tokenizer.
+            Hasher.hash(tokenizer),
+            max_seq_length,
+            padding,
+            data_args.task_name,
+            sentence1_key,
+            sentence2_key,
+            sorted(label_to_id.items(), key=str) if label_to_id is not None else None,
+        )
+    )
+    cache_file_names = {}
+    for split, dataset in raw_datasets.items():
+        if not dataset.cache_files:
+            # In-memory datasets have no cache directory, let `datasets` decide.
+            cache_file_names[split] = None
+            continue
+        # The Arrow files backing the split (and its indices mapping, if any) identify its content, the number of rows
+        # tells a split truncated with `--max_*_samples` apart from the full one.
+        source_files = [cache_file["filename"] for cache_file in dataset.cache_files]
+        fingerprint = hashlib.sha1(f"{source_files}-{len(dataset)}-{preprocessing_key}".encode()).hexdigest()[:16]
+        # Keep the tokenized files next to the dataset's own cache, already under `--cache_dir` when it is set.
+        cache_dir = os.path.dirname(source_files[0])
+        cache_file_names[split] = os.path.join(cache_dir, f"tokenized-{split}-{fingerprint}.arrow")
+
+    preprocessing_num_workers = data_args.preprocessing_num_workers
+    if preprocessing_num_workers is None:
+        # Give every worker at least one full `map` batch (1000 rows) of the smallest split, below that the process
+        # startup costs more than the fast tokenizer's own threading gives back.
+        smallest_split = min((len(dataset) for dataset in raw_datasets.values()), default=0)
+        preprocessing_num_workers = max(1, min(os.cpu_count() or 1, 8, smallest_split // 1000))
+    if preprocessing_num_workers > 1:
+        # The fast tokenizers parallelize internally as well, avoid oversubscribing the CPUs from every worker.
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
     with training_args.main_process_first(desc="dataset map pre-processing"):
         raw_datasets = raw_datasets.map(
             preprocess_function,
             batched=True,
+            num_proc=preprocessing_num_workers,
             load_from_cache_file=not data_args.overwrite_cache,
+            cache_file_names=cache_file_names,
             desc="Running tokenizer on dataset",
         )
     if training_args.do_train:
         if "train" not in raw_datasets:
             raise ValueError("--do_train requires a train dataset")
         train_dataset = raw_datasets["train"]
-        if data_args.max_train_samples is not None:
-            max_train_samples = min(len(train_dataset), data_args.max_train_samples)
-            train_dataset = train_dataset.select(range(max_train_samples))
 
     if training_args.do_eval:
         if "validation" not in raw_datasets and "validation_matched" not in raw_datasets:
             raise ValueError("--do_eval requires a validation dataset")
-        eval_dataset = raw_datasets["validation_matched" if data_args.task_name == "mnli" else "validation"]
-        if data_args.max_eval_samples is not None:
-            max_eval_samples = min(len(eval_dataset), data_args.max_eval_samples)
-            eval_dataset = eval_dataset.select(range(max_eval_samples))
+        eval_dataset = raw_datasets[eval_split]
+        if not data_args.pad_to_max_length:
+            # The metrics don't depend on the order of the examples.
+            eval_dataset, _ = sort_by_length(eval_dataset)
 
-    if training_args.do_predict or data_args.task_name is not None or data_args.test_file is not None:
+    if training_args.do_predict:
         if "test" not in raw_datasets and "test_matched" not in raw_datasets:
             raise ValueError("--do_predict requires a test dataset")
-        predict_dataset = raw_datasets["test_matched" if data_args.task_name == "mnli" else "test"]
-        if data_args.max_predict_samples is not None:
-            max_predict_samples = min(len(predict_dataset), data_args.max_predict_samples)
-            predict_dataset = predict_dataset.select(range(max_predict_samples))
+        predict_dataset = raw_datasets[predict_split]
 
-    # Log a few random samples from the training set:
-    if training_args.do_train:
+    # Log a few random samples from the training set (only fetched when they will actually be logged):
+    if training_args.do_train and logger.isEnabledFor(logging.INFO):
         for index in random.sample(range(len(train_dataset)), 3):
             logger.info(f"Sample {index} of the training set: {train_dataset[index]}.")
 
@@ -485,29 +754,25 @@ def main():
     else:
         metric = evaluate.load("accuracy")
 
-    # You can define your custom compute_metrics function. It takes an `EvalPrediction` object (a namedtuple with a
-    # predictions and label_ids field) and has to return a dictionary string to float.
-    def compute_metrics(p: EvalPrediction):
-        preds = p.predictions[0] if isinstance(p.predictions, tuple) else p.predictions
-        preds = np.squeeze(preds) if is_regression else np.argmax(preds, axis=1)
-        if data_args.task_name is not None:
-            result = metric.compute(predictions=preds, references=p.label_ids)
-            if len(result) > 1:
-                result["combined_score"] = np.mean(list(result.values())).item()
-            return result
-        elif is_regression:
-            return {"mse": ((preds - p.label_ids) ** 2).mean().item()}
-        else:
-            return {"accuracy": (preds == p.label_ids).astype(np.float32).mean().item()}
+    compute_metrics = partial(
+        compute_metrics_fn, metric=metric, is_regression=is_regression, task_name=data_args.task_name
+    )
 
     # Data collator will default to DataCollatorWithPadding when the tokenizer is passed to Trainer, so we change it if
-    # we already did the padding.
+    # we already did the padding. Otherwise, rounding each batch up to a multiple of 8 keeps the shapes aligned for
+    # tensor cores while avoiding the wasted compute of padding short sequences to `max_seq_length`.
     if data_args.pad_to_max_length:
         data_collator = default_data_collator
-    elif training_args.fp16:
+    elif tokenizer.pad_token_id is None:
+        # Let `tokenizer.pad` raise its explanatory error.
         data_collator = DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8)
     else:
-        data_collator = None
+        data_collator = partial(collate_with_padding, tokenizer=tokenizer, pad_to_multiple_of=8)
+
+    # Move the accumulated predictions to the CPU every ~2048 examples during evaluation, rather than growing a single
+    # tensor on the device over the whole split.
+    if training_args.eval_accumulation_steps is None:
+        training_args.eval_accumulation_steps = max(1, 2048 // training_args.eval_batch_size)
 
     # Initialize our Trainer
     trainer = Trainer(
@@ -550,6 +815,8 @@ def main():
         if data_args.task_name == "mnli":
             tasks.append("mnli-mm")
             eval_datasets.append(raw_datasets["validation_mismatched"])
+            if not data_args.pad_to_max_length:
+                eval_datasets[-1], _ = sort_by_length(eval_datasets[-1])
             combined = {}
 
         for eval_dataset, task in zip(eval_datasets, tasks):
@@ -578,23 +845,44 @@ def main():
             tasks.append("mnli-mm")
             predict_datasets.append(raw_datasets["test_mismatched"])
 
-        for predict_dataset, task in zip(predict_datasets, tasks):
-            # Removing the `label` columns because it contains -1 and Trainer won't like that.
-            predict_dataset = predict_dataset.remove_columns("label")
-            predictions = trainer.predict(predict_dataset, metric_key_prefix="predict").predictions
-            predictions = np.squeeze(predictions) if is_regression else np.argmax(predictions, axis=1)
-
+        # Run a single prediction pass over all the test sets and split the predictions afterwards.
+        predict_dataset = concatenate_datasets(predict_datasets)
+        # Removing the `label` columns because it contains -1 and Trainer won't like that.
+        predict_dataset = predict_dataset.remove_columns("label")
+        if not data_args.pad_to_max_length:
+            predict_dataset, order = sort_by_length(predict_dataset)
+        all_predictions = trainer.predict(predict_dataset, metric_key_prefix="predict").predictions
+        all_predictions = logits_to_predictions(all_predictions, is_regression)
+        if not data_args.pad_to_max_length:
+            # Put the predictions back in the original order of the test sets.
+            sorted_predictions, all_predictions = all_predictions, np.empty_like(all_predictions)
+            all_predictions[order] = sorted_predictions
+        split_indices = np.cumsum([len(dataset) for dataset in predict_datasets])[:-1]
+
+        for predictions, task in zip(np.split(all_predictions, split_indices), tasks):
             output_predict_file = os.path.join(training_args.output_dir, f"predict_results_{task}.txt")
             if trainer.is_world_process_zero():
-                with open(output_predict_file, "w") as writer:
+                # The rows are formatted and encoded at once, so a binary file skips the per-write text codec.
+                with open(output_predict_file, "wb") as writer:
                     logger.info(f"***** Predict results {task} *****")
-                    writer.write("index\tprediction\n")
-                    for index, item in enumerate(predictions):
-                        if is_regression:
-                            writer.write(f"{index}\t{item:3.3f}\n")
-                        else:
-                            item = label_list[item]
-                            writer.write(f"{index}\t{item}\n")
+                    writer.write(b"index\tprediction\n")
+                    if is_regression:
+                        rows = "".join(f"{index}\t{item:3.3f}\n" for index, item in enumerate(predictions.tolist()))
+                    else:
+                        predicted_labels = np.asarray(label_list, dtype=object)[predictions]
+                        rows = "".join(f"{index}\t{item}\n" for index, item in enumerate(predicted_labels))
+                    writer.write(rows.encode("utf-8"))
+
+    if model_args.to_onnx is not None and trainer.is_world_process_zero():
+        logger.info("*** Export to ONNX ***")
+
+        onnx_path = Path(model_args.to_onnx)
+        onnx_path.parent.mkdir(parents=True, exist_ok=True)
+        # Trace the model on the GPU it was trained on rather than copying all the weights back to the CPU.
+        export_device = "cuda" if model.device.type == "cuda" else "cpu"
+        model.to(export_device)
+        export(tokenizer, model, onnx_config, onnx_opset, onnx_path, device=export_device)
+        logger.info(f"{model_kind} model exported to {onnx_path.as_posix()}")
 
     kwargs = {"finetuned_from": model_args.model_name_or_path, "tasks": "text-classification"}
     if data_args.task_name is not None:
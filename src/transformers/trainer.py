@@ -430,6 +430,9 @@ class Trainer:
         self.data_collator = data_collator if data_collator is not None else default_collator
         self.train_dataset = train_dataset
         self.eval_dataset = eval_dataset
+        # Cached evaluation data loader, along with the dataset and data collator it was built from.
+        self._eval_dataloader = None
+        self._eval_dataloader_sources = None
         self.tokenizer = tokenizer
 
         if self.place_model_on_device:
@@ -828,6 +831,18 @@ class Trainer:
                     seed=seed,
                 )
 
+    def _get_dataloader_worker_kwargs(self) -> Dict[str, Any]:
+        """
+        Returns the keyword arguments controlling the worker processes of the [`~torch.utils.data.DataLoader`]s.
+        """
+        kwargs = {"num_workers": self.args.dataloader_num_workers, "pin_memory": self.args.dataloader_pin_memory}
+        # PyTorch rejects those options when the data is loaded in the main process.
+        if self.args.dataloader_num_workers > 0:
+            kwargs["persistent_workers"] = self.args.dataloader_persistent_workers
+            if self.args.dataloader_prefetch_factor is not None:
+                kwargs["prefetch_factor"] = self.args.dataloader_prefetch_factor
+        return kwargs
+
     def get_train_dataloader(self) -> DataLoader:
         """
         Returns the training [`~torch.utils.data.DataLoader`].
@@ -861,8 +876,7 @@ class Trainer:
                 train_dataset,
                 batch_size=self.args.per_device_train_batch_size,
                 collate_fn=data_collator,
-                num_workers=self.args.dataloader_num_workers,
-                pin_memory=self.args.dataloader_pin_memory,
+                **self._get_dataloader_worker_kwargs(),
             )
 
         train_sampler = self._get_train_sampler()
@@ -873,8 +887,7 @@ class Trainer:
             sampler=train_sampler,
             collate_fn=data_collator,
             drop_last=self.args.dataloader_drop_last,
-            num_workers=self.args.dataloader_num_workers,
-            pin_memory=self.args.dataloader_pin_memory,
+            **self._get_dataloader_worker_kwargs(),
             worker_init_fn=seed_worker,
         )
 
@@ -920,6 +933,17 @@ class Trainer:
         """
         if eval_dataset is None and self.eval_dataset is None:
             raise ValueError("Trainer: evaluation requires an eval_dataset.")
+        # With persistent workers, reuse the same data loader for each evaluation to avoid spawning new workers.
+        reuse_dataloader = (
+            eval_dataset is None and self.args.dataloader_persistent_workers and self.args.dataloader_num_workers > 0
+        )
+        if (
+            reuse_dataloader
+            and self._eval_dataloader is not None
+            and self._eval_dataloader_sources[0] is self.eval_dataset
+            and self._eval_dataloader_sources[1] is self.data_collator
+        ):
+            return self._eval_dataloader
         eval_dataset = eval_dataset if eval_dataset is not None else self.eval_dataset
         data_collator = self.data_collator
 
@@ -937,25 +961,28 @@ class Trainer:
                     num_processes=self.args.world_size,
                     process_index=self.args.process_index,
                 )
-            return DataLoader(
+            eval_dataloader = DataLoader(
                 eval_dataset,
                 batch_size=self.args.eval_batch_size,
                 collate_fn=data_collator,
-                num_workers=self.args.dataloader_num_workers,
-                pin_memory=self.args.dataloader_pin_memory,
+                **self._get_dataloader_worker_kwargs(),
             )
+        else:
+            eval_sampler = self._get_eval_sampler(eval_dataset)
 
-        eval_sampler = self._get_eval_sampler(eval_dataset)
+            eval_dataloader = DataLoader(
+                eval_dataset,
+                sampler=eval_sampler,
+                batch_size=self.args.eval_batch_size,
+                collate_fn=data_collator,
+                drop_last=self.args.dataloader_drop_last,
+                **self._get_dataloader_worker_kwargs(),
+            )
 
-        return DataLoader(
-            eval_dataset,
-            sampler=eval_sampler,
-            batch_size=self.args.eval_batch_size,
-            collate_fn=data_collator,
-            drop_last=self.args.dataloader_drop_last,
-            num_workers=self.args.dataloader_num_workers,
-            pin_memory=self.args.dataloader_pin_memory,
-        )
+        if reuse_dataloader:
+            self._eval_dataloader = eval_dataloader
+            self._eval_dataloader_sources = (self.eval_dataset, self.data_collator)
+        return eval_dataloader
 
     def get_test_dataloader(self, test_dataset: Dataset) -> DataLoader:
         """
@@ -988,8 +1015,7 @@ class Trainer:
                 test_dataset,
                 batch_size=self.args.eval_batch_size,
                 collate_fn=data_collator,
-                num_workers=self.args.dataloader_num_workers,
-                pin_memory=self.args.dataloader_pin_memory,
+                **self._get_dataloader_worker_kwargs(),
             )
 
         test_sampler = self._get_eval_sampler(test_dataset)
@@ -1001,8 +1027,7 @@ class Trainer:
             batch_size=self.args.eval_batch_size,
             collate_fn=data_collator,
             drop_last=self.args.dataloader_drop_last,
-            num_workers=self.args.dataloader_num_workers,
-            pin_memory=self.args.dataloader_pin_memory,
+            **self._get_dataloader_worker_kwargs(),
         )
 
     def create_optimizer_and_scheduler(self, num_training_steps: int):
@@ -423,6 +423,14 @@ class TrainingArguments:
             When using distributed training, the value of the flag `bucket_cap_mb` passed to `DistributedDataParallel`.
         dataloader_pin_memory (`bool`, *optional*, defaults to `True`):
             Whether you want to pin memory in data loaders or not. Will default to `True`.
+        dataloader_persistent_workers (`bool`, *optional*, defaults to `False`):
+            If `True`, the data loader will not shut down the worker processes after a dataset has been consumed once,
+            and the evaluation data loader is reused across evaluations. This allows to keep the workers' `Dataset`
+            instances alive, which can speed up training and evaluation but will increase RAM usage. Only used when
+            `dataloader_num_workers > 0`.
+        dataloader_prefetch_factor (`int`, *optional*):
+            Number of batches loaded in advance by each worker. Defaults to the PyTorch value when not set. Only used
+            when `dataloader_num_workers > 0`.
         skip_memory_metrics (`bool`, *optional*, defaults to `True`):
             Whether to skip adding of memory profiler reports to metrics. This is skipped by default because it slows
             down the training and evaluation speed.
@@ -887,6 +895,24 @@ class TrainingArguments:
     dataloader_pin_memory: bool = field(
         default=True, metadata={"help": "Whether or not to pin memory for DataLoader."}
     )
+    dataloader_persistent_workers: bool = field(
+        default=False,
+        metadata={
+            "help": (
+                "Whether or not to keep the DataLoader worker processes alive between epochs and evaluations. Only"
+                " used when `dataloader_num_workers > 0`."
+            )
+        },
+    )
+    dataloader_prefetch_factor: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": (
+                "Number of batches loaded in advance by each DataLoader worker. Only used when"
+                " `dataloader_num_workers > 0`."
+            )
+        },
+    )
     skip_memory_metrics: bool = field(
         default=True, metadata={"help": "Whether or not to skip adding of memory profiler reports to metrics."}
     )
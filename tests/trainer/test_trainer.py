@@ -720,6 +720,34 @@ class TrainerIntegrationTest(TestCasePlus, TrainerIntegrationCommon):
         new_eval_dataset = RegressionDataset(length=128)
         self.assertEqual(len(trainer.get_eval_dataloader(new_eval_dataset)), 128 // (32 * n_gpu))
 
+    def test_dataloader_persistent_workers(self):
+        trainer = get_regression_trainer(
+            dataloader_num_workers=2, dataloader_persistent_workers=True, dataloader_prefetch_factor=4
+        )
+        train_dataloader = trainer.get_train_dataloader()
+        self.assertTrue(train_dataloader.persistent_workers)
+        self.assertEqual(train_dataloader.prefetch_factor, 4)
+
+        # The evaluation dataloader is reused, unless a new dataset is passed
+        eval_dataloader = trainer.get_eval_dataloader()
+        self.assertTrue(eval_dataloader.persistent_workers)
+        self.assertIs(trainer.get_eval_dataloader(), eval_dataloader)
+        self.assertIsNot(trainer.get_eval_dataloader(RegressionDataset(length=128)), eval_dataloader)
+
+        # Reassigning the evaluation dataset or the data collator invalidates the cached dataloader
+        trainer.eval_dataset = RegressionDataset(length=32)
+        new_eval_dataloader = trainer.get_eval_dataloader()
+        self.assertIsNot(new_eval_dataloader, eval_dataloader)
+        self.assertIs(new_eval_dataloader.dataset, trainer.eval_dataset)
+        self.assertIs(trainer.get_eval_dataloader(), new_eval_dataloader)
+        trainer.data_collator = Mock(wraps=trainer.data_collator)
+        self.assertIsNot(trainer.get_eval_dataloader(), new_eval_dataloader)
+
+        # Those options are ignored when loading the data in the main process
+        trainer = get_regression_trainer(dataloader_num_workers=0, dataloader_persistent_workers=True)
+        self.assertFalse(trainer.get_train_dataloader().persistent_workers)
+        self.assertIsNot(trainer.get_eval_dataloader(), trainer.get_eval_dataloader())
+
     # tests that we do not require dataloader to have a .dataset attribute
     def test_dataloader_without_dataset(self):
         train_dataset = RegressionDataset(length=128)